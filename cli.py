@@ -8,6 +8,7 @@ from crawler import WebCrawler
 import pandas as pd
 from helpers.VPN import connect_to_vpn, disconnect_and_kill_vpn
 from helpers.essentials import vpn_path, chromium_path
+from helpers.retry import classify_error, CircuitBreaker, RetryScheduler
 
 def setup_logging():
     """Setup logging configuration with log rotation into logs/ folder"""
@@ -47,6 +48,11 @@ def read_urls_from_file(file_path):
     except Exception as e:
         raise IOError(f"Error reading file {file_path}: {e}")
 
+def check_file_exists(file_path):
+    """Fail before the run starts when an optional input file is missing"""
+    if file_path and not os.path.exists(file_path):
+        raise FileNotFoundError(f"File not found: {file_path}")
+
 def main():
     parser = argparse.ArgumentParser(description='Simple Web Crawler')
     
@@ -60,9 +66,28 @@ def main():
                        help='Directory to store website profiles')
     parser.add_argument('-ch', '--chromium', action='store_true', help='Path to Chromium executable')
     parser.add_argument('-vpn', '--vpn', action='store_true', help='Path to VPN executable')
+    parser.add_argument('-r', '--retries', type=int, default=2,
+                       help='Times a timed out, disconnected or crashed visit is retried')
+    parser.add_argument('-b', '--backoff', type=float, default=30,
+                       help='Base delay before a retry, doubled on each attempt (seconds)')
+    parser.add_argument('-dc', '--driver-crashes', type=int, default=2,
+                       help='Skip a domain after this many driver crashes (at most the number of retries)')
+    parser.add_argument('-mf', '--max-failures', type=int, default=10,
+                       help='Stop the run after this many consecutive DNS, timeout, connection or driver failures (0 to disable)')
+    parser.add_argument('-tl', '--tracker-list', help='CSV file with Domain and Category columns of known trackers')
+    parser.add_argument('-psl', '--suffix-list', help='Public suffix list file (public_suffix_list.dat format)')
+    parser.add_argument('-sp', '--subpages', nargs='+', default=[],
+                       help='Paths or URLs opened in extra tabs of each website (e.g. /about /contact)')
+    parser.add_argument('-l', '--links', type=int, default=0,
+                       help='Number of same-site links of the home page opened in extra tabs')
+    parser.add_argument('-mt', '--max-tabs', type=int, default=4,
+                       help='Maximum number of extra tabs per website')
 
     args = parser.parse_args()
 
+    check_file_exists(args.tracker_list)
+    check_file_exists(args.suffix_list)
+
     urls = []
 
     if args.url_category:
@@ -103,18 +128,48 @@ def main():
             df.to_csv(master_file, index=False)
     os.makedirs("data", exist_ok=True)
 
-    crawler = WebCrawler(profile_dir=args.profile_dir, chromium=chromium_path, logger=logger)
+    crawler = WebCrawler(profile_dir=args.profile_dir, chromium=chromium_path, logger=logger,
+                         tracker_list=args.tracker_list, suffix_list=args.suffix_list)
+
+    scheduler = RetryScheduler(max_retries=args.retries, base_delay=args.backoff)
+    # A domain that keeps crashing the driver is dropped before its retries run out
+    breaker = CircuitBreaker(domain_threshold=min(args.driver_crashes, args.retries), run_threshold=args.max_failures)
+    for i, url in enumerate(urls, 1):
+        scheduler.add(i, url)
 
     try:
         counter = 0
-        for i, url in enumerate(urls, 1):
-            logger.info(f"[{i}/{len(urls)}] Crawling: {url}")
+        while scheduler:
+            i, url, attempt = scheduler.next()
+
+            if breaker.is_open(url):
+                logger.warning(f"Circuit open for {url}, skipping")
+                continue
+
+            if attempt:
+                logger.info(f"[{i}/{len(urls)}] Retrying ({attempt}/{args.retries}): {url}")
+            else:
+                logger.info(f"[{i}/{len(urls)}] Crawling: {url}")
             
             try:
-                crawler.visit_website(i, url, wait_time=args.time, category=category)
+                crawler.visit_website(i, url, wait_time=args.time, category=category,
+                                      subpages=args.subpages, links=args.links, max_tabs=args.max_tabs)
+                breaker.record_success(url)
                 counter += 1
             except Exception as e:
-                logger.error(f"Failed to crawl {url}, continuing to next...")
+                error_class = classify_error(e)
+                breaker.record_failure(url, error_class)
+
+                if breaker.run_tripped():
+                    logger.error(f"{breaker.consecutive_failures} consecutive failures, stopping the run")
+                    break
+
+                if breaker.is_open(url):
+                    logger.error(f"Failed to crawl {url} ({error_class}), circuit open, no more retries")
+                elif scheduler.reschedule(i, url, attempt, error_class):
+                    logger.error(f"Failed to crawl {url} ({error_class}), retry scheduled")
+                else:
+                    logger.error(f"Failed to crawl {url} ({error_class}), continuing to next...")
                 continue
             
             if counter >= 20:
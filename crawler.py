@@ -5,21 +5,27 @@ import time
 import logging
 import threading
 from datetime import datetime
-from urllib.parse import urlparse
+from urllib.parse import urlparse, urljoin, urldefrag
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
+from helpers.retry import classify_error, ERROR_COMMENTS
+from helpers.domains import DomainClassifier
+from helpers.perflog import PerformanceLogDecoder
 
 class WebCrawler:
-    def __init__(self, profile_dir="profiles", chromium=None, logger=None):
+    def __init__(self, profile_dir="profiles", chromium=None, logger=None, tracker_list=None, suffix_list=None):
 
         self.profile_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), profile_dir)
         self.logger = logger or logging.getLogger(__name__)
         self.driver = None
         self.current_profile = None
         self.chromium = chromium
+        self.tabs = {}
+        self.log_decoder = PerformanceLogDecoder(("Network.requestWillBeSent", "Network.loadingFinished"))
+        self.classifier = DomainClassifier(suffix_file=suffix_list, tracker_file=tracker_list)
 
         os.makedirs(self.profile_dir, exist_ok=True)
     
@@ -56,15 +62,7 @@ class WebCrawler:
                 options=chrome_options
             )
             
-            # Enable network domain to capture all network events including headers
-            self.driver.execute_cdp_cmd("Network.enable", {
-                "maxTotalBufferSize": 10000000,
-                "maxResourceBufferSize": 5000000,
-                "maxPostDataSize": 5000000
-            })
-            
-            # Also enable Page domain for complete monitoring
-            self.driver.execute_cdp_cmd("Page.enable", {})
+            self._enable_monitoring()
             
             self.logger.info("ChromeDriver initialized successfully")
             return True
@@ -84,6 +82,85 @@ class WebCrawler:
                 self.logger.error(f"Fallback initialization also failed: {e2}")
                 return False
     
+    def _enable_monitoring(self):
+        """Enable CDP domains on the current tab"""
+        # Enable network domain to capture all network events including headers
+        self.driver.execute_cdp_cmd("Network.enable", {
+            "maxTotalBufferSize": 10000000,
+            "maxResourceBufferSize": 5000000,
+            "maxPostDataSize": 5000000
+        })
+        
+        # Also enable Page domain for complete monitoring
+        self.driver.execute_cdp_cmd("Page.enable", {})
+    
+    def _get_same_site_links(self, limit):
+        """Collect up to limit distinct links of the current page pointing to the same site"""
+        if limit <= 0:
+            return []
+        try:
+            hrefs = self.driver.execute_script(
+                "return Array.from(document.querySelectorAll('a[href]'), a => a.href);"
+            ) or []
+        except Exception as e:
+            self.logger.warning(f"Could not collect links: {e}")
+            return []
+
+        current_url = urldefrag(self.driver.current_url)[0]
+        site = self.classifier.registrable_domain(urlparse(current_url).netloc)
+        links = []
+        for href in hrefs:
+            href = urldefrag(href)[0]
+            if not href.startswith(("http://", "https://")) or href == current_url or href in links:
+                continue
+            if self.classifier.registrable_domain(urlparse(href).netloc) == site:
+                links.append(href)
+                if len(links) >= limit:
+                    break
+        return links
+    
+    @staticmethod
+    def _target_id(handle):
+        """Performance log target id of a window handle, legacy handles carry a CDwindow- prefix"""
+        return handle[len("CDwindow-"):] if handle.startswith("CDwindow-") else handle
+    
+    def _open_tabs(self, urls, timeout=20):
+        """Open urls in new tabs of the current browser, the pages load concurrently"""
+        root = self.driver.current_window_handle
+        opened = []
+
+        # Start every navigation without waiting for the load, the browser loads the tabs in parallel
+        for tab_url in urls:
+            try:
+                self.driver.switch_to.new_window("tab")
+            except Exception as e:
+                self.logger.warning(f"Could not open tab {tab_url}: {e}")
+                continue
+
+            handle = self.driver.current_window_handle
+            self.tabs[self._target_id(handle)] = tab_url
+            opened.append((handle, tab_url))
+            try:
+                self._enable_monitoring()
+                self.driver.execute_script("window.location.href = arguments[0];", tab_url)
+                self.logger.info(f"Opened tab: {tab_url}")
+            except Exception as e:
+                self.logger.warning(f"Could not navigate tab to {tab_url}: {e}")
+
+        deadline = time.time() + timeout
+        for handle, tab_url in opened:
+            try:
+                self.driver.switch_to.window(handle)
+                WebDriverWait(self.driver, max(deadline - time.time(), 1)).until(
+                    lambda d: d.execute_script(
+                        "return location.href !== 'about:blank' && document.readyState === 'complete';"
+                    )
+                )
+            except Exception as e:
+                self.logger.warning(f"Tab {tab_url} did not finish loading: {e}")
+
+        self.driver.switch_to.window(root)
+    
     def _get_profile_name(self, url):
         """Extract profile name from URL"""
         parsed_url = urlparse(url)
@@ -111,26 +188,40 @@ class WebCrawler:
             logs = self.driver.get_log("performance")
             requests = []
             cookies_before_request = {}
+            unknown_targets = set()
+            self.log_decoder.reset()
             
             for log_entry in logs:
                 try:
-                    log_message = json.loads(log_entry["message"])["message"]
-                    method = log_message["method"]
-                    params = log_message["params"]
+                    # Only the consumed events are fully parsed, each tab logs under its own target id
+                    decoded = self.log_decoder.decode(log_entry["message"])
+                    if decoded is None:
+                        continue
+                    method, params, target = decoded
                     
                     if method == "Network.requestWillBeSent":
                         request_id = params["requestId"]
                         request = params["request"]
                         
+                        page_url = self.tabs.get(target)
+                        if page_url is None:
+                            page_url = ""
+                            if target not in unknown_targets:
+                                unknown_targets.add(target)
+                                self.logger.warning(f"Requests from unknown tab {target!r} are saved with the website URL as page_url")
+                        
                         # Capture cookies before this request
                         try:
                             current_cookies = self.driver.get_cookies()
-                            cookies_before_request[request_id] = {f"{c['name']}:{c.get('domain', '')}": c for c in current_cookies}
+                            cookies_before_request[(target, request_id)] = {f"{c['name']}:{c.get('domain', '')}": c for c in current_cookies}
                         except:
-                            cookies_before_request[request_id] = {}
+                            cookies_before_request[(target, request_id)] = {}
                         
                         requests.append({
                             "id": request_id,
+                            "target": target,
+                            "frame": params.get("frameId", ""),
+                            "page_url": page_url,
                             "url": request["url"],
                             "method": request["method"],
                             "timestamp": datetime.fromtimestamp(log_entry["timestamp"] / 1000).isoformat(),
@@ -148,8 +239,8 @@ class WebCrawler:
                             
                             # Find the request this corresponds to
                             for req in requests:
-                                if req["id"] == request_id and request_id in cookies_before_request:
-                                    prev_cookies = cookies_before_request[request_id]
+                                if req["id"] == request_id and req["target"] == target and (target, request_id) in cookies_before_request:
+                                    prev_cookies = cookies_before_request[(target, request_id)]
                                     
                                     # Find new cookies
                                     new_cookies = []
@@ -180,6 +271,8 @@ class WebCrawler:
             # Debug logging
             cookies_found = sum(len(req.get("cookies_set", [])) for req in requests)
             self.logger.info(f"Captured {len(requests)} requests with {cookies_found} cookies set via network activity")
+            stats = self.log_decoder.stats
+            self.logger.info(f"Performance log: {stats['decoded']} entries decoded, {stats['skipped']} skipped, {stats['errors']} unreadable")
             
             return requests
         except Exception as e:
@@ -239,6 +332,8 @@ class WebCrawler:
                 continue
             
             request_domain = request_url.split("/")[2] if "://" in request_url else ""
+            request_site = self.classifier.registrable_domain(request_domain)
+            request_category = self.classifier.category(request_domain)
             
             # Check if this request set any cookies (from before/after comparison)
             cookies_set = request.get("cookies_set", [])
@@ -257,27 +352,23 @@ class WebCrawler:
                     if not cookie_name or not cookie_value:
                         continue
                     
-                    # Determine party_type
-                    if cookie_domain:
-                        cookie_domain_clean = cookie_domain.lstrip(".")
-                        if source_domain.endswith(cookie_domain_clean) or cookie_domain_clean == source_domain:
-                            party_type = "first-party"
-                        else:
-                            party_type = "third-party"
-                    else:
-                        party_type = "unknown"
+                    party_type = self.classifier.party_type(cookie_domain, source_domain)
                     
                     entry = {
                         "cookie_name": cookie_name,
                         "cookie_value": cookie_value,
                         "cookie_domain": cookie_domain,
+                        "cookie_site": self.classifier.registrable_domain(cookie_domain),
                         "cookie_path": cookie_path,
                         "cookie_secure": cookie_secure,
                         "cookie_httpOnly": cookie_httpOnly,
                         "request_url": request_url,
                         "request_method": request_method,
+                        "request_site": request_site,
+                        "request_category": request_category,
                         "request_timestamp": request_timestamp,
                         "source_url": url,
+                        "page_url": request.get("page_url") or url,
                         "timestamp": timestamp,
                         "page_title": page_title,
                         "browser_id": browser_id,
@@ -309,26 +400,23 @@ class WebCrawler:
                     # Check if this cookie hasn't been processed yet
                     cookie_key = f"{cookie_name}:{cookie_domain}"
                     if matches_domain and cookie_key not in processed_cookies:
-                        # Determine party_type
-                        if cookie_domain:
-                            if source_domain.endswith(cookie_domain_clean) or cookie_domain_clean == source_domain:
-                                party_type = "first-party"
-                            else:
-                                party_type = "third-party"
-                        else:
-                            party_type = "unknown"
+                        party_type = self.classifier.party_type(cookie_domain, source_domain)
 
                         entry = {
                             "cookie_name": cookie_name,
                             "cookie_value": cookie_value,
                             "cookie_domain": cookie_domain,
+                            "cookie_site": self.classifier.registrable_domain(cookie_domain),
                             "cookie_path": cookie_path,
                             "cookie_secure": cookie_secure,
                             "cookie_httpOnly": cookie_httpOnly,
                             "request_url": request_url,
                             "request_method": request_method,
+                            "request_site": request_site,
+                            "request_category": request_category,
                             "request_timestamp": request_timestamp,
                             "source_url": url,
+                            "page_url": request.get("page_url") or url,
                             "timestamp": timestamp,
                             "page_title": page_title,
                             "browser_id": browser_id,
@@ -348,8 +436,8 @@ class WebCrawler:
         except Exception as e:
             self.logger.error(f"Error saving data: {e}")
     
-    def visit_website(self, website_index, url, wait_time=10, category='Unknown'):
-        """Visit a website and capture data"""
+    def visit_website(self, website_index, url, wait_time=10, category='Unknown', subpages=None, links=0, max_tabs=4):
+        """Visit a website and capture data, subpages and same-site links are opened in extra tabs"""
         try:
             if not url.startswith(("http://", "https://")):
                 url = "https://" + url
@@ -427,6 +515,14 @@ class WebCrawler:
             # time.sleep(2.11)
             # self.driver.get(url)
             
+            self.tabs = {self._target_id(self.driver.current_window_handle): domain_root}
+            tab_urls = [urljoin(domain_root + "/", page) for page in subpages or []]
+            tab_urls += [link for link in self._get_same_site_links(links) if link not in tab_urls]
+            tab_urls = tab_urls[:max_tabs]
+            if tab_urls:
+                self.logger.info(f"Opening {len(tab_urls)} pages in tabs...")
+                self._open_tabs(tab_urls)
+            
             WebDriverWait(self.driver, 20).until(
                 EC.presence_of_element_located((By.TAG_NAME, "body"))
             )
@@ -461,6 +557,7 @@ class WebCrawler:
 
             # Update masterfile.csv safely
             rows = []
+            updated = False
             with open('masterfile.csv', 'r', newline='', encoding='utf-8') as mf:
                 reader = csv.reader(mf)
                 header = next(reader)
@@ -495,25 +592,6 @@ class WebCrawler:
                 writer = csv.writer(mf)
                 writer.writerows(rows)
             
-            # Remove from input file if success
-            if file_path and not comment:
-                # Read CSV and remove the domain
-                import csv
-                rows = []
-                with open(file_path, 'r', newline='', encoding='utf-8') as f:
-                    reader = csv.DictReader(f)
-                    rows = [row for row in reader if row['Domain'] != domain_to_remove]
-                
-                # Write back without the removed domain
-                if rows:
-                    with open(file_path, 'w', newline='', encoding='utf-8') as f:
-                        if rows:
-                            writer = csv.DictWriter(f, fieldnames=rows[0].keys())
-                            writer.writeheader()
-                            writer.writerows(rows)
-                
-                self.logger.info(f"Removed {domain_to_remove} from {file_path} after successful crawl")
-            
             self.logger.info(f"Title: {self.driver.title}")
             self.logger.info(f"URL(last visited page/subpage): {self.driver.current_url}")
             self.logger.info(f"Cookies captured: {len(cookies)}")
@@ -521,6 +599,7 @@ class WebCrawler:
             
         except Exception as e:
             self.logger.error(f"Error visiting {url}: {e}")
+            failure_comment = ERROR_COMMENTS[classify_error(e)]
             
             if self.driver:
                 self.driver.quit()
@@ -545,15 +624,15 @@ class WebCrawler:
                             row[5] = "0"
                             row[6] = "0"
                             row[7] = datetime.now().isoformat()
-                            row[8] = "Connection timeout"
+                            row[8] = failure_comment
                             updated = True
                         rows.append(row)
                 
                 if not updated:
                     if 'Region' not in header:
-                        new_row = [str(website_index), url, category, "", "Failed", "0", "0", datetime.now().isoformat(), "Connection timeout"]
+                        new_row = [str(website_index), url, category, "", "Failed", "0", "0", datetime.now().isoformat(), failure_comment]
                     else:
-                        new_row = [str(website_index), url, category, "", "Failed", "0", "0", datetime.now().isoformat(), "Connection timeout"]
+                        new_row = [str(website_index), url, category, "", "Failed", "0", "0", datetime.now().isoformat(), failure_comment]
                     rows.append(new_row)
                 
                 with open('masterfile.csv', 'w', newline='', encoding='utf-8') as mf:
@@ -0,0 +1,123 @@
+import csv
+import os
+from functools import lru_cache
+
+# Copy of https://publicsuffix.org/list/public_suffix_list.dat, -psl overrides it with a newer list
+DEFAULT_SUFFIX_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "public_suffix_list.dat")
+
+_EXCEPTION = "!"
+_WILDCARD = "*"
+_LEAF = ""
+
+
+def _normalize(host: str) -> str:
+    host = host.strip().lower().lstrip(".").rstrip(".")
+    if "://" in host:
+        host = host.split("/")[2]
+    if host.startswith("["):
+        return host
+    return host.rsplit(":", 1)[0] if host.count(":") == 1 else host
+
+
+def _to_ascii(rule: str) -> str:
+    """Punycode form of internationalized rules, hosts in request URLs are already encoded"""
+    if rule.isascii():
+        return rule
+    try:
+        return ".".join(label if label.isascii() else label.encode("idna").decode("ascii") for label in rule.split("."))
+    except UnicodeError:
+        return rule
+
+
+def _is_ip(host: str) -> bool:
+    return ":" in host or host.replace(".", "").isdigit()
+
+
+class DomainClassifier:
+    """Map hosts to their registrable domain (eTLD+1) and tracker category"""
+
+    def __init__(self, suffix_file=None, tracker_file=None, cache_size=65536):
+        self._suffixes = {}
+        self.trackers = {}
+
+        self.load_suffixes(suffix_file or DEFAULT_SUFFIX_FILE)
+        if tracker_file:
+            self.load_trackers(tracker_file)
+
+        self.registrable_domain = lru_cache(maxsize=cache_size)(self._registrable_domain)
+        self.category = lru_cache(maxsize=cache_size)(self._category)
+
+    def _compile(self, rules):
+        """Build a trie of reversed labels, e.g. co.uk -> {"uk": {"co": {"": True}}}"""
+        for rule in rules:
+            node = self._suffixes
+            for label in reversed(_to_ascii(rule.lower()).split(".")):
+                node = node.setdefault(label, {})
+            node[_LEAF] = True
+
+    def load_suffixes(self, file_path):
+        """Load rules in the public_suffix_list.dat format"""
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"File not found: {file_path}")
+        with open(file_path, "r", encoding="utf-8") as f:
+            rules = [line.split()[0] for line in f if line.strip() and not line.startswith("//")]
+        self._compile(rules)
+
+    def load_trackers(self, file_path):
+        """Load a CSV with Domain and Category columns"""
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"File not found: {file_path}")
+        with open(file_path, "r", newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                domain = _normalize(row.get("Domain") or "")
+                if domain:
+                    self.trackers[domain] = (row.get("Category") or "tracker").strip()
+
+    def _suffix_length(self, labels):
+        """Number of trailing labels forming the public suffix"""
+        node = self._suffixes
+        matched = 1  # an unknown TLD is still treated as a suffix
+        for depth, label in enumerate(reversed(labels), 1):
+            if _EXCEPTION + label in node:
+                return depth - 1
+            # A wildcard covers this label even when a longer explicit rule continues below it
+            if _WILDCARD in node:
+                matched = depth
+            if label not in node:
+                break
+            node = node[label]
+            if _LEAF in node:
+                matched = depth
+        return matched
+
+    def _registrable_domain(self, host: str) -> str:
+        host = _normalize(host)
+        if not host or _is_ip(host):
+            return host
+        labels = host.split(".")
+        suffix_length = self._suffix_length(labels)
+        if suffix_length >= len(labels):
+            return host
+        return ".".join(labels[-suffix_length - 1:])
+
+    def _category(self, host: str) -> str:
+        """Tracker category of the host or its closest listed parent domain"""
+        if not self.trackers:
+            return ""
+        labels = _normalize(host).split(".")
+        for i in range(len(labels) - 1):
+            category = self.trackers.get(".".join(labels[i:]))
+            if category:
+                return category
+        return ""
+
+    def party_type(self, cookie_domain: str, source_domain: str) -> str:
+        """first-party when the cookie and the visited site share a registrable domain"""
+        if not cookie_domain:
+            return "unknown"
+        if self.registrable_domain(cookie_domain) == self.registrable_domain(source_domain):
+            return "first-party"
+        return "third-party"
+
+
+__all__ = ["DomainClassifier"]
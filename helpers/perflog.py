@@ -0,0 +1,61 @@
+import json
+
+try:
+    import orjson
+    _loads = orjson.loads
+    _DecodeError = orjson.JSONDecodeError
+except ImportError:
+    _loads = json.loads
+    _DecodeError = json.JSONDecodeError
+
+_METHOD_KEY = '"method":"'
+
+
+class PerformanceLogDecoder:
+    """Decode only the performance log entries whose CDP method is wanted"""
+
+    def __init__(self, methods):
+        self.methods = frozenset(methods)
+        self.stats = {"decoded": 0, "skipped": 0, "errors": 0}
+
+    def reset(self):
+        for key in self.stats:
+            self.stats[key] = 0
+
+    @staticmethod
+    def peek_method(raw: str):
+        """Read the CDP method from the raw message without parsing it, None if not found"""
+        start = raw.find(_METHOD_KEY)
+        if start == -1:
+            return None
+        start += len(_METHOD_KEY)
+        end = raw.find('"', start)
+        method = raw[start:end] if end != -1 else ""
+        # CDP methods are Domain.event, anything else is a nested key such as the HTTP method of a request
+        return method if "." in method else None
+
+    def decode(self, raw: str):
+        """Return the message of a wanted entry as (method, params, webview), None otherwise"""
+        method = self.peek_method(raw)
+        if method is not None and method not in self.methods:
+            self.stats["skipped"] += 1
+            return None
+
+        try:
+            entry = _loads(raw)
+            message = entry["message"]
+            method = message["method"]
+        except (_DecodeError, KeyError, TypeError):
+            self.stats["errors"] += 1
+            return None
+
+        # Unusual formatting defeated the prefilter, the full parse still filters it
+        if method not in self.methods:
+            self.stats["skipped"] += 1
+            return None
+
+        self.stats["decoded"] += 1
+        return method, message.get("params", {}), entry.get("webview", "")
+
+
+__all__ = ["PerformanceLogDecoder"]
@@ -0,0 +1,136 @@
+import heapq
+import itertools
+import time
+from urllib.parse import urlparse
+
+DNS = "dns"
+TIMEOUT = "timeout"
+DRIVER = "driver"
+NETWORK = "network"
+OTHER = "other"
+
+# Comment written to masterfile.csv for each error class
+ERROR_COMMENTS = {
+    DNS: "DNS resolution failed",
+    TIMEOUT: "Connection timeout",
+    DRIVER: "Driver crash",
+    NETWORK: "Connection failed",
+    OTHER: "Crawl error",
+}
+
+# A missing DNS record will not appear on a retry, only timeouts, crashes and connection errors are retried
+RETRYABLE = {TIMEOUT, DRIVER, NETWORK}
+
+# Failures caused by the target or the network rather than by the crawler itself
+SYSTEMATIC = {DNS, TIMEOUT, DRIVER, NETWORK}
+
+_DNS_MARKERS = ("err_name_not_resolved", "err_name_resolution_failed", "dns_probe", "name or service not known")
+_TIMEOUT_MARKERS = ("timeout", "timed out", "err_connection_timed_out", "err_timed_out")
+# Refused, reset or dropped connections, typical of a blocked region or VPN
+_NETWORK_MARKERS = (
+    "err_connection_", "err_address_unreachable", "err_internet_disconnected", "err_tunnel_", "err_proxy_",
+)
+_DRIVER_MARKERS = (
+    "chrome not reachable", "session deleted", "invalid session id", "disconnected: not connected to devtools",
+    "crashed", "failed to initialize chromedriver", "devtoolsactiveport", "no such window",
+)
+
+
+def classify_error(error) -> str:
+    """Classify a visit exception as dns, timeout, network, driver or other"""
+    name = type(error).__name__.lower()
+    message = str(error).lower()
+
+    if any(marker in message for marker in _DNS_MARKERS):
+        return DNS
+    if "timeout" in name or any(marker in message for marker in _TIMEOUT_MARKERS):
+        return TIMEOUT
+    if any(marker in message for marker in _NETWORK_MARKERS):
+        return NETWORK
+    if name in ("invalidsessionidexception", "nosuchwindowexception", "sessionnotcreatedexception") \
+            or any(marker in message for marker in _DRIVER_MARKERS):
+        return DRIVER
+    return OTHER
+
+
+def domain_key(url: str) -> str:
+    """Key used to group failures of the same domain"""
+    if not url.startswith(("http://", "https://")):
+        url = "https://" + url
+    netloc = urlparse(url).netloc.lower()
+    return netloc[4:] if netloc.startswith("www.") else netloc
+
+
+class CircuitBreaker:
+    """Fast-fail domains, or the whole run, after repeated failures"""
+
+    def __init__(self, domain_threshold=2, run_threshold=10):
+        self.domain_threshold = max(domain_threshold, 1)
+        self.run_threshold = run_threshold
+        self.domain_failures = {}
+        self.consecutive_failures = 0
+
+    def record_success(self, url):
+        self.domain_failures.pop(domain_key(url), None)
+        self.consecutive_failures = 0
+
+    def record_failure(self, url, error_class):
+        """Count a failure, only DNS, timeout, connection and driver errors point to a dead target"""
+        if error_class not in SYSTEMATIC:
+            return
+        self.consecutive_failures += 1
+
+        # A missing DNS record opens the domain right away, driver crashes after domain_threshold of them,
+        # timeouts and connection errors may be transient and are only limited by the retry count
+        key = domain_key(url)
+        if error_class == DNS:
+            self.domain_failures[key] = self.domain_threshold
+        elif error_class == DRIVER:
+            self.domain_failures[key] = self.domain_failures.get(key, 0) + 1
+
+    def is_open(self, url) -> bool:
+        """True when the domain has failed too often to be worth another visit"""
+        return self.domain_failures.get(domain_key(url), 0) >= self.domain_threshold
+
+    def run_tripped(self) -> bool:
+        """True when the last visits all failed, e.g. the region or VPN is blocked"""
+        return bool(self.run_threshold) and self.consecutive_failures >= self.run_threshold
+
+
+class RetryScheduler:
+    """Queue of visits ordered by due time, failed visits come back after exponential backoff"""
+
+    def __init__(self, max_retries=2, base_delay=30.0, max_delay=600.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._queue = []
+        self._counter = itertools.count()
+
+    def __len__(self):
+        return len(self._queue)
+
+    def add(self, index, url, attempt=0, delay=0.0):
+        due = time.monotonic() + delay if delay else 0.0
+        heapq.heappush(self._queue, (due, next(self._counter), index, url, attempt))
+
+    def backoff(self, attempt) -> float:
+        return min(self.base_delay * (2 ** attempt), self.max_delay)
+
+    def reschedule(self, index, url, attempt, error_class) -> bool:
+        """Queue a failed visit again, returns False when it should not be retried"""
+        if error_class not in RETRYABLE or attempt >= self.max_retries:
+            return False
+        self.add(index, url, attempt + 1, self.backoff(attempt))
+        return True
+
+    def next(self):
+        """Pop the next visit as (index, url, attempt), sleeping until it is due"""
+        due, _, index, url, attempt = heapq.heappop(self._queue)
+        remaining = due - time.monotonic()
+        if remaining > 0:
+            time.sleep(remaining)
+        return index, url, attempt
+
+
+__all__ = ["classify_error", "domain_key", "CircuitBreaker", "RetryScheduler", "ERROR_COMMENTS", "RETRYABLE", "SYSTEMATIC"]